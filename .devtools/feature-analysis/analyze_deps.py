@@ -8,26 +8,111 @@ This script analyzes Cargo.toml to identify:
 3. Feature interdependencies
 """
 
+import hashlib
 import json
 import subprocess
 import re
 import os
+import sys
 from collections import defaultdict
 
+try:
+    import orjson
+except ImportError:  # Optional; the standard library json module is used instead
+    orjson = None
+
+def json_loads(data):
+    """Parse JSON text or bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(obj):
+    """Serialize an object to JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+# On-disk cache of `cargo metadata` output, invalidated when the manifest changes
+CARGO_META_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cargo_meta_cache.json")
+
+def find_workspace_root(start_dir=None):
+    """Find the nearest directory containing a Cargo.toml, as cargo does"""
+    current = os.path.abspath(start_dir or os.getcwd())
+    while True:
+        if os.path.exists(os.path.join(current, "Cargo.toml")):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+def manifest_fingerprint(workspace_root):
+    """Hash Cargo.toml and Cargo.lock so cached metadata can be invalidated"""
+    digest = hashlib.blake2b()
+    for name in ("Cargo.toml", "Cargo.lock"):
+        path = os.path.join(workspace_root, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        # Separate the files so moving content between them changes the hash
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def load_cached_metadata(fingerprint):
+    """Return cached cargo metadata if it matches the current fingerprint"""
+    try:
+        with open(CARGO_META_CACHE, "rb") as f:
+            cache = json_loads(f.read())
+    except (OSError, ValueError):
+        # ValueError covers both malformed JSON and undecodable bytes
+        return None
+    
+    if not isinstance(cache, dict) or cache.get("fingerprint") != fingerprint:
+        return None
+    return cache.get("metadata")
+
+def save_cached_metadata(fingerprint, metadata):
+    """Atomically write cargo metadata to the on-disk cache"""
+    tmp_path = CARGO_META_CACHE + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(json_dumps({"fingerprint": fingerprint, "metadata": metadata}))
+        os.replace(tmp_path, CARGO_META_CACHE)
+    except OSError as e:
+        print(f"Warning: could not write cargo metadata cache: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
 def run_cargo_metadata():
-    """Get detailed cargo metadata in JSON format"""
+    """Get detailed cargo metadata in JSON format, reusing the cache when unchanged"""
+    workspace_root = find_workspace_root()
+    fingerprint = manifest_fingerprint(workspace_root) if workspace_root else None
+    
+    if fingerprint:
+        metadata = load_cached_metadata(fingerprint)
+        if metadata is not None:
+            return metadata
+    
     try:
         result = subprocess.run(
             ["cargo", "metadata", "--format-version=1"],
             capture_output=True, text=True, check=True
         )
-        return json.loads(result.stdout)
+        metadata = json_loads(result.stdout)
     except subprocess.CalledProcessError as e:
         print(f"Error running cargo metadata: {e}")
         return None
     except json.JSONDecodeError as e:
         print(f"Error parsing cargo metadata: {e}")
         return None
+    
+    # Fingerprint again: cargo creates or updates Cargo.lock while running
+    if workspace_root:
+        save_cached_metadata(manifest_fingerprint(workspace_root), metadata)
+    return metadata
 
 def extract_dependency_information(metadata):
     """Extract dependency and feature information from cargo metadata"""
@@ -42,14 +127,17 @@ def extract_dependency_information(metadata):
         print("Root package not found!")
         return None
     
-    # Get features
-    features = root_package["features"]
+    # Get features, interning names since they recur across every resolved set
+    features = {
+        sys.intern(name): [sys.intern(item) for item in items]
+        for name, items in root_package["features"].items()
+    }
     
     # Get dependencies
     dependencies = []
     for dep in root_package["dependencies"]:
         dependency = {
-            "name": dep["name"],
+            "name": sys.intern(dep["name"]),
             "optional": dep.get("optional", False),
             "features": dep.get("features", []),
             "kind": dep.get("kind", "normal"),
@@ -70,40 +158,52 @@ def calculate_dependency_usage(data):
         deps = []
         for item in feature_items:
             if item.startswith("dep:"):
-                deps.append(item[4:])  # Remove 'dep:' prefix
+                deps.append(sys.intern(item[4:]))  # Remove 'dep:' prefix
         feature_deps[feature_name] = deps
     
-    # Resolve transitive dependencies
-    resolved_deps = defaultdict(set)
+    # Resolve transitive dependencies, memoizing each feature's resolved set
+    cache = {}
+    visiting = set()
     
-    def resolve_feature(feature_name, seen=None):
-        if seen is None:
-            seen = set()
-        
-        if feature_name in seen:
-            return set()  # Circular dependency
+    def resolve_feature(feature_name):
+        if feature_name in cache:
+            return cache[feature_name]
         
-        seen.add(feature_name)
+        if feature_name in visiting:
+            return frozenset()  # Circular dependency
         
         if feature_name not in data["features"]:
-            return set()
-            
-        direct_deps = set(feature_deps.get(feature_name, []))
-        indirect_deps = set()
+            return frozenset()
         
-        for item in data["features"][feature_name]:
-            if not item.startswith("dep:") and item in data["features"]:
-                indirect_deps.update(resolve_feature(item, seen.copy()))
+        # Mark on entry and always unmark on exit; one shared set for the walk
+        visiting.add(feature_name)
+        try:
+            resolved = set(feature_deps.get(feature_name, []))
+            for item in data["features"][feature_name]:
+                if not item.startswith("dep:") and item in data["features"]:
+                    resolved.update(resolve_feature(item))
+        finally:
+            visiting.discard(feature_name)
         
-        return direct_deps.union(indirect_deps)
+        cache[feature_name] = frozenset(resolved)
+        return cache[feature_name]
     
     # Calculate complete dependency sets
+    resolved_deps = {}
     for feature in data["features"]:
         resolved_deps[feature] = resolve_feature(feature)
     
     return resolved_deps
 
-def generate_dependency_matrix(data, resolved_deps):
+def build_reverse_index(resolved_deps):
+    """Map each dependency to the set of features that require it"""
+    dep_features = defaultdict(set)
+    for feature, deps in resolved_deps.items():
+        for dep in deps:
+            dep_features[dep].add(feature)
+    return dep_features
+
+def generate_dependency_matrix(data, dep_features):
     """Generate a markdown table showing which dependencies are used by which features"""
     all_features = sorted(data["features"].keys())
     
@@ -134,25 +234,14 @@ def generate_dependency_matrix(data, resolved_deps):
         if dep_name in dev_deps:
             continue
             
-        row = f"| {dep_name} "
+        present = dep_features.get(dep_name, set())
         
-        if dep_name in optional_deps:
-            # Optional dependency
-            for feature in all_features:
-                if dep_name in resolved_deps[feature]:
-                    row += "| ✅ "
-                else:
-                    row += "| ❌ "
-        else:
-            # Non-optional dependency
-            for feature in all_features:
-                if dep_name in resolved_deps[feature]:
-                    row += "| ✅ "
-                else:
-                    row += "| ⚪ "
+        # Features without the dependency: optional deps are excluded (❌),
+        # non-optional deps are always included (⚪)
+        absent = "❌" if dep_name in optional_deps else "⚪"
+        cells = ["✅" if feature in present else absent for feature in all_features]
         
-        row += "|"
-        table.append(row)
+        table.append("| " + dep_name + " | " + " | ".join(cells) + " |")
     
     table.append("\nLegend:")
     table.append("- ✅: Required by feature")
@@ -161,7 +250,7 @@ def generate_dependency_matrix(data, resolved_deps):
     
     return "\n".join(table)
 
-def identify_optimization_candidates(data, resolved_deps):
+def identify_optimization_candidates(data, dep_features):
     """Identify dependencies that could be made optional"""
     # Dependencies used by some features but not all
     all_features = set(data["features"].keys())
@@ -173,16 +262,13 @@ def identify_optimization_candidates(data, resolved_deps):
             continue
             
         # Find which features use this dependency
-        used_by_features = []
-        for feature, deps in resolved_deps.items():
-            if dep["name"] in deps:
-                used_by_features.append(feature)
+        used_by_features = sorted(dep_features.get(dep["name"], ()))
         
         # If used by some features but not all, it's a candidate
         if 0 < len(used_by_features) < len(all_features):
             candidates.append({
                 "name": dep["name"],
-                "used_by": sorted(used_by_features),
+                "used_by": used_by_features,
             })
     
     return candidates
@@ -200,30 +286,37 @@ def main():
     
     # Calculate dependency usage
     resolved_deps = calculate_dependency_usage(data)
+    dep_features = build_reverse_index(resolved_deps)
     
     # Generate dependency matrix
-    matrix = generate_dependency_matrix(data, resolved_deps)
+    matrix = generate_dependency_matrix(data, dep_features)
     
     # Identify optimization candidates
-    candidates = identify_optimization_candidates(data, resolved_deps)
+    candidates = identify_optimization_candidates(data, dep_features)
+    
+    # Build the candidates section once for both the console and the report
+    candidate_lines = [
+        f"- **{candidate['name']}**: Used by {', '.join(candidate['used_by'])}\n"
+        for candidate in candidates
+    ]
     
     # Output results
     print(matrix)
     
     print("\n\n# Optimization Candidates\n")
     print("The following dependencies could be made optional:")
-    
-    for candidate in candidates:
-        print(f"- **{candidate['name']}**: Used by {', '.join(candidate['used_by'])}")
+    print("".join(candidate_lines), end="")
     
     # Write results to a file
+    parts = [
+        matrix,
+        "\n\n# Optimization Candidates\n\n",
+        "The following dependencies could be made optional:\n\n",
+    ]
+    parts.extend(candidate_lines)
+    
     with open("dependency_analysis.md", "w") as f:
-        f.write(matrix)
-        f.write("\n\n# Optimization Candidates\n\n")
-        f.write("The following dependencies could be made optional:\n\n")
-        
-        for candidate in candidates:
-            f.write(f"- **{candidate['name']}**: Used by {', '.join(candidate['used_by'])}\n")
+        f.write("".join(parts))
     
     print("\nAnalysis complete. Results saved to dependency_analysis.md")
 
@@ -8,34 +8,110 @@ This script analyzes the codebase to:
 3. Generate a feature usage report
 """
 
+import mmap
 import os
 import re
 import json
+import shutil
 import subprocess
 import sys
+import tomllib
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # Optional; the standard library json module is used instead
+    orjson = None
+
+def json_loads(data):
+    """Parse JSON text or bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps_pretty(obj):
+    """Serialize an object to 2-space indented JSON bytes, using orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode('utf-8')
+
 # Feature mapping patterns
 FEATURE_PATTERNS = {
-    # Pattern for cfg attributes
-    'cfg_attributes': re.compile(r'#\[cfg\((.*?)\)\]', re.DOTALL),
+    # Pattern for cfg and cfg_attr attributes (also covers those inside cfg_if!)
+    # Byte patterns, so files can be scanned in place without decoding
+    'cfg_attributes': re.compile(rb'#\[cfg(?:_attr)?\((.*?)\)\]', re.DOTALL),
     
     # Pattern for feature usage with if/cfg
-    'cfg_if': re.compile(r'(?:feature\s*=\s*"([^"]+)")'),
+    'cfg_if': re.compile(rb'(?:feature\s*=\s*"([^"]+)")'),
     
     # Pattern for using dep: syntax in Cargo.toml
     'dep_syntax': re.compile(r'dep:([a-zA-Z0-9_-]+)'),
+}
+
+# Directories never worth scanning: build output, vendored code and VCS data.
+# Hidden directories (.git, .devtools, ...) are skipped as well.
+SKIP_DIRS = {'target', 'node_modules'}
+
+# Pattern passed to ripgrep when it is available; mirrors
+# FEATURE_PATTERNS['cfg_attributes'] so both scanners report the same data
+RG_CFG_PATTERN = r'#\[cfg(?:_attr)?\((?s:.*?)\)\]'
+
+def scan_with_ripgrep(base_dir):
+    """Scan all Rust files for feature usage in a single ripgrep pass
     
-    # Pattern for feature blocks in Cargo.toml
-    'feature_block': re.compile(r'(?:^|\n)\s*\[features\]\s*\n(.*?)(?=\n\s*\[|\Z)', re.DOTALL),
+    Returns (feature_usage, total_files, files_with_features), or None when
+    ripgrep is unavailable or fails so the caller can fall back to Python.
+    """
+    rg = shutil.which('rg')
+    if rg is None:
+        return None
     
-    # Pattern for conditional compilation in code
-    'cfg_condition': re.compile(r'#\[cfg\(.*?feature\s*=\s*"([^"]+)".*?\)\]', re.DOTALL),
+    print(f"Scanning Rust files in {base_dir} with ripgrep...")
     
-    # Pattern for cfg_if usage
-    'cfg_if_let': re.compile(r'cfg_if::cfg_if!\s*\{\s*if\s*#\[cfg\(.*?feature\s*=\s*"([^"]+)".*?\)\]', re.DOTALL),
-}
+    feature_usage = defaultdict(set)
+    matched_files = set()
+    total_files = 0
+    
+    # rg skips hidden directories itself; exclude SKIP_DIRS the same way the
+    # Python walk does, since .gitignore does not cover them
+    args = [rg, '--json', '-U', '--type', 'rust']
+    for skip_dir in sorted(SKIP_DIRS):
+        args += ['-g', f'!{skip_dir}/']
+    
+    # Read raw bytes: rg emits UTF-8 regardless of locale, and json_loads
+    # accepts bytes. The context manager always closes the pipe and reaps rg.
+    with subprocess.Popen(args + [RG_CFG_PATTERN, base_dir], stdout=subprocess.PIPE) as proc:
+        try:
+            for line in proc.stdout:
+                event = json_loads(line)
+                
+                if event['type'] == 'match':
+                    path = event['data']['path'].get('text')
+                    if path is None:
+                        continue  # Non UTF-8 path
+                    rel_path = os.path.relpath(path, base_dir)
+                    
+                    # Each submatch is a whole cfg attribute; pull every name out of it
+                    for submatch in event['data']['submatches']:
+                        attrs = submatch['match'].get('text', '').encode('utf-8')
+                        for feature_match in FEATURE_PATTERNS['cfg_if'].finditer(attrs):
+                            feature_usage[feature_match.group(1).decode('utf-8')].add(rel_path)
+                            matched_files.add(rel_path)
+                elif event['type'] == 'summary':
+                    total_files = event['data']['stats']['searches']
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            proc.kill()
+            print(f"WARNING: could not parse ripgrep output ({e}), falling back to Python scan.")
+            return None
+    
+    # Exit code 1 only means nothing matched
+    if proc.returncode not in (0, 1):
+        print("WARNING: ripgrep failed, falling back to Python scan.")
+        return None
+    
+    return feature_usage, total_files, len(matched_files)
 
 def find_rust_files(base_dir):
     """Find all Rust source files in the codebase"""
@@ -43,7 +119,10 @@ def find_rust_files(base_dir):
     
     print(f"Searching for Rust files in {base_dir}...")
     
-    for root, _, files in os.walk(base_dir):
+    for root, dirs, files in os.walk(base_dir):
+        # Prune in place so os.walk never descends into skipped directories
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith('.')]
+        
         for file in files:
             if file.endswith('.rs'):
                 rust_files.append(os.path.join(root, file))
@@ -60,32 +139,10 @@ def extract_cargo_features(cargo_toml_path):
             print(f"ERROR: Cargo.toml not found at {cargo_toml_path}")
             return {}
             
-        with open(cargo_toml_path, 'r') as f:
-            content = f.read()
-            
-        features = {}
-        feature_match = FEATURE_PATTERNS['feature_block'].search(content)
+        with open(cargo_toml_path, 'rb') as f:
+            cargo_toml = tomllib.load(f)
         
-        if feature_match:
-            feature_block = feature_match.group(1)
-            
-            # Extract simple features (feature = [])
-            for line in feature_block.split('\n'):
-                line = line.strip()
-                if '=' in line:
-                    key, value = [x.strip() for x in line.split('=', 1)]
-                    # Normalize the value
-                    if value.startswith('[') and value.endswith(']'):
-                        # It's an array
-                        raw_deps = value[1:-1].strip()
-                        if raw_deps:
-                            deps = [d.strip().strip('"') for d in raw_deps.split(',')]
-                            features[key] = deps
-                        else:
-                            features[key] = []
-                    else:
-                        # It's a single value
-                        features[key] = [value.strip('"')]
+        features = cargo_toml.get('features', {})
         
         print(f"Extracted {len(features)} features.")
         return features
@@ -96,40 +153,28 @@ def extract_cargo_features(cargo_toml_path):
 def analyze_file_features(file_path):
     """Analyze a file for feature flag usage"""
     try:
-        with open(file_path, 'r') as f:
-            content = f.read()
-        
         features = set()
         
-        # Direct feature attributes (most common case)
-        for match in FEATURE_PATTERNS['cfg_condition'].finditer(content):
-            feature_name = match.group(1)
-            features.add(feature_name)
-        
-        # Check for cfg attributes with multiple features (any, all, etc.)
-        for match in FEATURE_PATTERNS['cfg_attributes'].finditer(content):
-            attrs = match.group(1)
-            # Extract feature names
-            for feature_match in FEATURE_PATTERNS['cfg_if'].finditer(attrs):
-                features.add(feature_match.group(1))
-        
-        # Check for cfg_if macros
-        for match in FEATURE_PATTERNS['cfg_if_let'].finditer(content):
-            feature_name = match.group(1)
-            features.add(feature_name)
+        with open(file_path, 'rb') as f:
+            # mmap cannot map an empty file
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            
+            # Scan the mapped bytes directly; only captured names are decoded
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                # A single sweep over the file; feature names (including any/all
+                # combinations) are then pulled out of each short attribute body
+                for match in FEATURE_PATTERNS['cfg_attributes'].finditer(content):
+                    for feature_match in FEATURE_PATTERNS['cfg_if'].finditer(match.group(1)):
+                        features.add(feature_match.group(1).decode('utf-8'))
         
         return list(features)
     except Exception as e:
         print(f"ERROR analyzing {file_path}: {e}")
         return []
 
-def generate_feature_inventory(base_dir):
-    """Generate inventory of feature usage across the codebase"""
-    cargo_toml_path = os.path.join(base_dir, 'Cargo.toml')
-    
-    # Extract defined features
-    features = extract_cargo_features(cargo_toml_path)
-    
+def scan_with_python(base_dir):
+    """Scan all Rust files for feature usage one file at a time"""
     # Find all Rust files
     rust_files = find_rust_files(base_dir)
     
@@ -140,24 +185,45 @@ def generate_feature_inventory(base_dir):
     file_count = 0
     files_with_features = 0
     
-    for file in rust_files:
-        file_features = analyze_file_features(file)
-        rel_path = os.path.relpath(file, base_dir)
+    # Files are independent, so fan the scan out across cores and aggregate
+    # the results here; chunksize amortizes IPC over many small files
+    with ProcessPoolExecutor() as executor:
+        results = executor.map(analyze_file_features, rust_files, chunksize=64)
         
-        if file_features:
-            files_with_features += 1
+        for file, file_features in zip(rust_files, results):
+            rel_path = os.path.relpath(file, base_dir)
             
-        for feature in file_features:
-            feature_usage[feature].append(rel_path)
-            
-        file_count += 1
-        if file_count % 100 == 0:
-            print(f"Processed {file_count} files...")
+            if file_features:
+                files_with_features += 1
+                
+            for feature in file_features:
+                feature_usage[feature].append(rel_path)
+                
+            file_count += 1
+            if file_count % 100 == 0:
+                print(f"Processed {file_count} files...")
+    
+    return feature_usage, file_count, files_with_features
+
+def generate_feature_inventory(base_dir):
+    """Generate inventory of feature usage across the codebase"""
+    cargo_toml_path = os.path.join(base_dir, 'Cargo.toml')
+    
+    # Extract defined features
+    features = extract_cargo_features(cargo_toml_path)
+    
+    # Prefer a single native ripgrep pass over the whole tree
+    scan = scan_with_ripgrep(base_dir)
+    if scan is not None:
+        feature_usage, file_count, files_with_features = scan
+    else:
+        feature_usage, file_count, files_with_features = scan_with_python(base_dir)
     
     # Generate report data
     report = {
         'defined_features': features,
-        'feature_usage': {k: sorted(v) for k, v in feature_usage.items()},
+        # Sort features too: neither scanner yields them in a stable order
+        'feature_usage': {k: sorted(v) for k, v in sorted(feature_usage.items())},
         'stats': {
             'total_files': file_count,
             'files_with_features': files_with_features
@@ -183,80 +249,86 @@ def main():
         
         # Save report as JSON
         json_path = os.path.join(report_dir, 'feature_inventory.json')
-        with open(json_path, 'w') as f:
-            json.dump(inventory, f, indent=2)
+        with open(json_path, 'wb') as f:
+            f.write(json_dumps_pretty(inventory))
         
         print(f"Saved JSON report to {json_path}")
         
         # Generate markdown report
         markdown_path = os.path.join(report_dir, 'feature_inventory.md')
         
-        with open(markdown_path, 'w') as f:
-            f.write("# Feature Flag Inventory\n\n")
-            
-            # Write summary stats
-            f.write("## Summary\n\n")
-            f.write(f"- Total Rust files analyzed: {inventory['stats']['total_files']}\n")
-            f.write(f"- Files with feature flags: {inventory['stats']['files_with_features']}\n")
-            f.write(f"- Features defined in Cargo.toml: {len(inventory['defined_features'])}\n")
-            f.write(f"- Features used in codebase: {len(inventory['feature_usage'])}\n\n")
+        # Build the report in memory and write it out in one call
+        parts = []
+        append = parts.append
+        
+        append("# Feature Flag Inventory\n\n")
+        
+        # Write summary stats
+        append("## Summary\n\n")
+        append(f"- Total Rust files analyzed: {inventory['stats']['total_files']}\n")
+        append(f"- Files with feature flags: {inventory['stats']['files_with_features']}\n")
+        append(f"- Features defined in Cargo.toml: {len(inventory['defined_features'])}\n")
+        append(f"- Features used in codebase: {len(inventory['feature_usage'])}\n\n")
+        
+        # Write defined features
+        append("## Defined Features\n\n")
+        for feature, deps in inventory['defined_features'].items():
+            append(f"### {feature}\n\n")
+            if deps:
+                append("Dependencies:\n")
+                for dep in deps:
+                    append(f"- {dep}\n")
+            else:
+                append("No dependencies.\n")
             
-            # Write defined features
-            f.write("## Defined Features\n\n")
-            for feature, deps in inventory['defined_features'].items():
-                f.write(f"### {feature}\n\n")
-                if deps:
-                    f.write("Dependencies:\n")
-                    for dep in deps:
-                        f.write(f"- {dep}\n")
-                else:
-                    f.write("No dependencies.\n")
+            # Check for usage
+            if feature in inventory['feature_usage']:
+                append(f"\nUsed in {len(inventory['feature_usage'][feature])} files.\n")
+            else:
+                append("\nNot used directly in code.\n")
+            append("\n")
+        
+        # Write feature usage
+        append("## Feature Usage\n\n")
+        if inventory['feature_usage']:
+            for feature, files in inventory['feature_usage'].items():
+                append(f"### {feature}\n\n")
                 
-                # Check for usage
-                if feature in inventory['feature_usage']:
-                    f.write(f"\nUsed in {len(inventory['feature_usage'][feature])} files.\n")
+                if feature in inventory['defined_features']:
+                    append("Status: ✓ Defined in Cargo.toml\n\n")
                 else:
-                    f.write("\nNot used directly in code.\n")
-                f.write("\n")
-            
-            # Write feature usage
-            f.write("## Feature Usage\n\n")
-            if inventory['feature_usage']:
-                for feature, files in inventory['feature_usage'].items():
-                    f.write(f"### {feature}\n\n")
-                    
-                    if feature in inventory['defined_features']:
-                        f.write("Status: ✓ Defined in Cargo.toml\n\n")
-                    else:
-                        f.write("Status: ❌ Not defined in Cargo.toml\n\n")
-                    
-                    f.write(f"Used in {len(files)} files:\n")
-                    for file in files:
-                        f.write(f"- `{file}`\n")
-                    f.write("\n")
-            else:
-                f.write("No feature usage detected in the codebase.\n\n")
-            
-            # Write recommendations
-            f.write("## Recommendations\n\n")
-            
-            # Find features defined but not used
-            unused_features = [f for f in inventory['defined_features'] if f not in inventory['feature_usage']]
-            if unused_features:
-                f.write("### Unused Features\n\n")
-                f.write("The following features are defined but not directly used in code (they might be used indirectly through dependencies):\n\n")
-                for feature in unused_features:
-                    f.write(f"- `{feature}`\n")
-                f.write("\n")
-            
-            # Find features used but not defined
-            undefined_features = [f for f in inventory['feature_usage'] if f not in inventory['defined_features']]
-            if undefined_features:
-                f.write("### Undefined Features\n\n")
-                f.write("The following features are used in code but not defined in Cargo.toml:\n\n")
-                for feature in undefined_features:
-                    f.write(f"- `{feature}`\n")
-                f.write("\n")
+                    append("Status: ❌ Not defined in Cargo.toml\n\n")
+                
+                append(f"Used in {len(files)} files:\n")
+                for file in files:
+                    append(f"- `{file}`\n")
+                append("\n")
+        else:
+            append("No feature usage detected in the codebase.\n\n")
+        
+        # Write recommendations
+        append("## Recommendations\n\n")
+        
+        # Find features defined but not used
+        unused_features = [f for f in inventory['defined_features'] if f not in inventory['feature_usage']]
+        if unused_features:
+            append("### Unused Features\n\n")
+            append("The following features are defined but not directly used in code (they might be used indirectly through dependencies):\n\n")
+            for feature in unused_features:
+                append(f"- `{feature}`\n")
+            append("\n")
+        
+        # Find features used but not defined
+        undefined_features = [f for f in inventory['feature_usage'] if f not in inventory['defined_features']]
+        if undefined_features:
+            append("### Undefined Features\n\n")
+            append("The following features are used in code but not defined in Cargo.toml:\n\n")
+            for feature in undefined_features:
+                append(f"- `{feature}`\n")
+            append("\n")
+        
+        with open(markdown_path, 'w') as f:
+            f.write("".join(parts))
         
         print(f"Saved Markdown report to {markdown_path}")
     except Exception as e: